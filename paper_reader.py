@@ -3,7 +3,13 @@ import json
 import os
 import datetime
 import time
-from typing import TypedDict, List
+import math
+import bisect
+import struct
+import threading
+import asyncio
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import TypedDict, List, Dict, Optional, Tuple
 from urllib.parse import urljoin
 from bs4 import BeautifulSoup
 import os
@@ -11,7 +17,7 @@ from dotenv import load_dotenv
 # 自动加载 .env 文件
 load_dotenv()
 
-from openai import OpenAI
+from openai import OpenAI, AsyncOpenAI
 import re
 
 # 定义状态类型
@@ -23,11 +29,93 @@ class PPTState(TypedDict):
     paper_title: str  # 新增论文标题字段
     png_images: List[str]  # 新增PNG图片字段
     temp_filename: str  # 新增临时文件名字段
+    image_formats: Dict[str, str]  # 图片URL -> 识别出的格式
+
+# LLM配置（可通过 .env 覆盖）
+QWEN_BASE_URL = os.getenv("QWEN_BASE_URL", "https://dashscope.aliyuncs.com/compatible-mode/v1")
+QWEN_MODEL = os.getenv("QWEN_MODEL", "qwen-plus")
+QWEN_TIMEOUT = float(os.getenv("QWEN_TIMEOUT", "120"))
+
+# 尾延迟对冲配置：超过延迟分位数仍未返回时，发送一个对冲请求，取先成功的结果
+HEDGE_ENABLED = os.getenv("QWEN_HEDGE_ENABLED", "0").lower() in ("1", "true", "yes")
+HEDGE_PERCENTILE = float(os.getenv("QWEN_HEDGE_PERCENTILE", "95"))
+HEDGE_MODEL = os.getenv("QWEN_HEDGE_MODEL") or QWEN_MODEL  # 可设置为更便宜/更快的模型
+HEDGE_BASE_URL = os.getenv("QWEN_HEDGE_BASE_URL") or QWEN_BASE_URL  # 可设置为备用服务地址
+HEDGE_API_KEY = os.getenv("QWEN_HEDGE_API_KEY") or os.getenv("QWEN_API_KEY")
+HEDGE_DEFAULT_DELAY = float(os.getenv("QWEN_HEDGE_DEFAULT_DELAY", "20"))  # 样本不足时的对冲延迟（秒）
+HEDGE_MIN_SAMPLES = int(os.getenv("QWEN_HEDGE_MIN_SAMPLES", "20"))
 
 # 初始化OpenAI客户端（兼容Qwen API）
 client = OpenAI(
     api_key=os.getenv("QWEN_API_KEY"),
-    base_url="https://dashscope.aliyuncs.com/compatible-mode/v1",
+    base_url=QWEN_BASE_URL,
+    timeout=QWEN_TIMEOUT,
+)
+
+class LatencyHistogram:
+    """按指数分桶统计的请求延迟直方图（单位：秒）"""
+    # 0.5秒起，每档乘以√2，上限约6分钟
+    BUCKETS = [0.5 * 2 ** (i / 2) for i in range(20)]
+    # 样本数达到上限时计数减半，让旧样本逐渐失效，阈值随近期延迟变化
+    MAX_SAMPLES = 1000
+
+    def __init__(self):
+        self.counts = [0] * (len(self.BUCKETS) + 1)
+        self.total = 0
+        self.lock = threading.Lock()
+
+    def record(self, seconds: float):
+        """记录一次请求的耗时（被取消的请求记录取消时已耗费的时间）"""
+        index = bisect.bisect_left(self.BUCKETS, seconds)
+        with self.lock:
+            self.counts[index] += 1
+            self.total += 1
+            if self.total >= self.MAX_SAMPLES:
+                self.counts = [count // 2 for count in self.counts]
+                self.total = sum(self.counts)
+
+    def percentile(self, p: float) -> Optional[float]:
+        """返回第p百分位所在分桶的上界，无样本时返回None"""
+        with self.lock:
+            if self.total == 0:
+                return None
+            target = max(1, math.ceil(self.total * p / 100))
+            cumulative = 0
+            for index, count in enumerate(self.counts):
+                cumulative += count
+                if cumulative >= target:
+                    return self.BUCKETS[min(index, len(self.BUCKETS) - 1)]
+        return self.BUCKETS[-1]
+
+# 每个模型一份延迟直方图
+latency_histograms: Dict[str, LatencyHistogram] = {}
+_histograms_lock = threading.Lock()
+
+# 对冲请求在独立的后台事件循环中执行，异步客户端按 (base_url, api_key) 在该循环上复用连接池
+_hedge_loop: Optional[asyncio.AbstractEventLoop] = None
+_hedge_loop_lock = threading.Lock()
+_async_clients: Dict[Tuple[str, str], AsyncOpenAI] = {}  # 只在后台事件循环线程中访问
+
+# 图片分类配置：只读取文件头部，按尺寸和宽高比筛选图表
+IMAGE_HEADER_BYTES = 16384
+MIN_FIGURE_SIZE = 100  # 宽或高小于该像素数视为图标
+MAX_FIGURE_ASPECT_RATIO = 6  # 宽高比超过该值视为横幅/分隔条
+IMAGE_CLASSIFY_WORKERS = 8
+MAX_IMAGE_CANDIDATES = 100  # 每个页面最多分类的候选图片数（按页面顺序）
+
+# 图片分类结果缓存（URL -> 格式、尺寸及判定结果，确定不是图片时为None）
+# 只缓存确定的结论，超时、5xx、429等临时失败不缓存，之后可重新分类
+image_classification_cache: Dict[str, Optional[dict]] = {}
+_image_inflight: Dict[str, Future] = {}  # 正在分类的URL，避免重复请求
+_image_cache_lock = threading.Lock()
+
+# SVG长度单位换算为像素，em、%等相对单位视为尺寸未知
+SVG_UNIT_TO_PX = {"": 1.0, "px": 1.0, "pt": 4 / 3, "pc": 16.0, "in": 96.0, "cm": 96 / 2.54, "mm": 96 / 25.4}
+_SVG_NUMBER = r'(?:\d+(?:\.\d*)?|\.\d+)'
+# SVG文档必须以<svg开头，前面只允许处理指令（如XML声明、xml-stylesheet）、注释和DOCTYPE（可含内部子集）
+_SVG_ROOT_PATTERN = re.compile(
+    r'^\ufeff?\s*(?:(?:<\?.*?\?>|<!--.*?-->|<!DOCTYPE[^>\[]*(?:\[.*?\]\s*)?>)\s*)*(<svg\b[^>]*>)',
+    re.IGNORECASE | re.DOTALL
 )
 
 def sanitize_filename(filename: str) -> str:
@@ -122,6 +210,122 @@ def extract_paper_title(text_content: str, url: str) -> str:
     
     return title
 
+def get_latency_histogram(model: str) -> LatencyHistogram:
+    """获取（必要时创建）指定模型的延迟直方图"""
+    with _histograms_lock:
+        if model not in latency_histograms:
+            latency_histograms[model] = LatencyHistogram()
+        return latency_histograms[model]
+
+def hedge_delay(model: str) -> float:
+    """根据模型的历史延迟计算发送对冲请求前的等待时间"""
+    histogram = get_latency_histogram(model)
+    if histogram.total < HEDGE_MIN_SAMPLES:
+        return HEDGE_DEFAULT_DELAY
+    return histogram.percentile(HEDGE_PERCENTILE)
+
+def _get_hedge_loop() -> asyncio.AbstractEventLoop:
+    """获取（必要时启动）执行对冲请求的后台事件循环，守护线程不会阻塞进程退出"""
+    global _hedge_loop
+    with _hedge_loop_lock:
+        if _hedge_loop is None:
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="qwen-hedge-loop", daemon=True).start()
+            _hedge_loop = loop
+        return _hedge_loop
+
+def _get_async_client(base_url: str, api_key: str) -> AsyncOpenAI:
+    """获取复用的异步客户端，超时和重试配置与全局client一致"""
+    key = (base_url, api_key)
+    if key not in _async_clients:
+        _async_clients[key] = AsyncOpenAI(
+            api_key=api_key,
+            base_url=base_url,
+            timeout=client.timeout,
+            max_retries=client.max_retries,
+        )
+    return _async_clients[key]
+
+async def _timed_completion(llm_client: AsyncOpenAI, model: str, messages, record_cancelled: bool = False) -> str:
+    """以流式方式请求一次对话并记录耗时，任务被取消时立即断开连接"""
+    start = time.monotonic()
+    stream = None
+    parts = []
+    try:
+        stream = await llm_client.chat.completions.create(
+            model=model,
+            messages=messages,
+            temperature=0.7,
+            max_tokens=4000,
+            stream=True,
+        )
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                parts.append(chunk.choices[0].delta.content)
+    except asyncio.CancelledError:
+        # 被取消的慢请求（主请求）记录已耗费的时间（截尾样本），避免分位数只统计快请求而逐渐偏低；
+        # 对冲请求被取消时耗时可能很短，不是有效的下界，不记录
+        if record_cancelled:
+            get_latency_histogram(model).record(time.monotonic() - start)
+        raise
+    finally:
+        if stream is not None:
+            await stream.response.aclose()
+    
+    if not parts:
+        raise ValueError(f"{model} API返回空响应")
+    
+    get_latency_histogram(model).record(time.monotonic() - start)
+    return "".join(parts)
+
+async def _hedged_chat(messages) -> str:
+    """对冲请求的异步实现，返回先成功的结果并取消其余请求"""
+    deadline = time.monotonic() + QWEN_TIMEOUT
+    primary_client = _get_async_client(QWEN_BASE_URL, os.getenv("QWEN_API_KEY"))
+    hedge_client = _get_async_client(HEDGE_BASE_URL, HEDGE_API_KEY)
+    tasks = [asyncio.create_task(_timed_completion(primary_client, QWEN_MODEL, messages, record_cancelled=True))]
+    errors = []
+    
+    try:
+        # 首次等待不超过总超时
+        first_wait = min(hedge_delay(QWEN_MODEL), max(0.0, deadline - time.monotonic()))
+        done, pending = await asyncio.wait(tasks, timeout=first_wait)
+        hedge_sent = False
+        
+        while True:
+            for task in done:
+                try:
+                    return task.result()
+                except Exception as e:
+                    errors.append(e)
+            
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError(f"LLM请求超过{QWEN_TIMEOUT}秒未返回")
+            
+            if not hedge_sent:
+                print(f"LLM请求较慢或失败，发送对冲请求：{HEDGE_MODEL} @ {HEDGE_BASE_URL}")
+                hedge_task = asyncio.create_task(_timed_completion(hedge_client, HEDGE_MODEL, messages))
+                tasks.append(hedge_task)
+                pending = set(pending) | {hedge_task}
+                hedge_sent = True
+            
+            if not pending:
+                raise RuntimeError("主请求与对冲请求均失败：" + "；".join(str(e) for e in errors)) from errors[-1]
+            
+            done, pending = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        # 取消仍在进行的请求（包括尚未收到首字节的请求）并关闭连接
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+def qwen_hedged_chat(messages) -> str:
+    """发送对冲请求：主请求超过延迟分位数未返回（或失败）时，向备用模型/地址再发一次，取先成功的结果"""
+    # 在后台事件循环中执行，调用方处于运行中的事件循环（如Jupyter）时同样可用
+    return asyncio.run_coroutine_threadsafe(_hedged_chat(messages), _get_hedge_loop()).result()
+
 def qwen_chat(messages):
     """使用Qwen LLM进行对话"""
     try:
@@ -137,9 +341,13 @@ def qwen_chat(messages):
         if not formatted_messages:
             return "错误：没有有效的消息格式"
         
+        # 尾延迟模式：使用对冲请求
+        if HEDGE_ENABLED:
+            return qwen_hedged_chat(formatted_messages)
+        
         # 调用Qwen API
         response = client.chat.completions.create(
-            model="qwen-plus",
+            model=QWEN_MODEL,
             messages=formatted_messages,
             temperature=0.7,
             max_tokens=4000,
@@ -205,9 +413,10 @@ def web_scraper(state: PPTState):
                     else:
                         absolute_url = urljoin(url, src)
                     
-                    # 验证URL是否为有效的图片链接
-                    if is_valid_image_url(absolute_url):
-                        image_urls.append(absolute_url)
+                    image_urls.append(absolute_url)
+            
+            # 按页面顺序去重并限制候选数量后，根据图片头部筛选有效的图表
+            image_urls = filter_figure_images(list(dict.fromkeys(image_urls))[:MAX_IMAGE_CANDIDATES])
             
             # 如果没有找到图片，尝试从文本中提取图片引用
             if not image_urls:
@@ -232,12 +441,11 @@ def web_scraper(state: PPTState):
             for img in soup.find_all('img'):
                 src = img.get('src')
                 if src:
-                    absolute_url = urljoin(url, src)
-                    if is_valid_image_url(absolute_url):
-                        image_urls.append(absolute_url)
+                    image_urls.append(urljoin(url, src))
+            image_urls = filter_figure_images(list(dict.fromkeys(image_urls))[:MAX_IMAGE_CANDIDATES])
         
-        # 去重并限制数量
-        image_urls = list(set(image_urls))[:100]  # 最多10张图片
+        # 去重并限制数量（保持页面顺序）
+        image_urls = list(dict.fromkeys(image_urls))[:100]  # 最多10张图片
         
         # 保存爬取结果到本地文件
         scraped_data = {
@@ -270,7 +478,7 @@ def web_scraper(state: PPTState):
         }
 
 def arxiv_png_crawler(state: PPTState):
-    """爬取URL的PNG图片"""
+    """爬取URL的图表图片（PNG/JPEG/SVG/WebP等）"""
     url = state["content_url"]
     
     headers = {
@@ -279,7 +487,7 @@ def arxiv_png_crawler(state: PPTState):
     }
     
     if not url.startswith(('http://', 'https://')):
-        return {"png_images": [], "temp_filename": None}
+        return {"png_images": [], "temp_filename": None, "image_formats": {}}
     
     max_retries = 3
     timeout = 15
@@ -291,15 +499,15 @@ def arxiv_png_crawler(state: PPTState):
             response.raise_for_status()
             
             soup = BeautifulSoup(response.text, 'html.parser')
-            img_tags = soup.find_all('img', {'src': lambda x: x and x.lower().endswith('.png')})
+            img_tags = soup.find_all('img', {'src': lambda x: x and not x.startswith('data:')})
             
             base_url = url if url.endswith('/') else url + '/'
             png_urls = [urljoin(base_url, img['src']) for img in img_tags]
             
-            # 去重
-            png_urls = list(dict.fromkeys(png_urls))
+            # 按页面顺序去重并限制候选数量后，根据图片头部筛选图表
+            png_urls = filter_figure_images(list(dict.fromkeys(png_urls))[:MAX_IMAGE_CANDIDATES])
             
-            print(f"爬取到 {len(png_urls)} 张PNG图片")
+            print(f"爬取到 {len(png_urls)} 张图表图片")
             
             # 生成临时JSON文件存储图片信息
             temp_images_data = {
@@ -312,10 +520,14 @@ def arxiv_png_crawler(state: PPTState):
             
             # 为每张图片添加详细信息
             for i, img_url in enumerate(png_urls, 1):
+                classification = classify_image(img_url) or {}
                 img_info = {
                     "index": i,
                     "url": img_url,
                     "filename": os.path.basename(img_url),
+                    "format": classification.get("format"),
+                    "width": classification.get("width"),
+                    "height": classification.get("height"),
                     "status": "pending"  # 可以后续添加下载状态
                 }
                 temp_images_data["image_details"].append(img_info)
@@ -327,34 +539,194 @@ def arxiv_png_crawler(state: PPTState):
             
             print(f"图片信息已保存到临时文件：{temp_filename}")
             
-            return {"png_images": png_urls, "temp_filename": temp_filename}
+            image_formats = {info["url"]: info["format"] for info in temp_images_data["image_details"] if info["format"]}
+            return {"png_images": png_urls, "temp_filename": temp_filename, "image_formats": image_formats}
             
         except requests.exceptions.RequestException as e:
             if attempt == max_retries - 1:
-                print(f"爬取PNG图片失败：{e}")
-                return {"png_images": [], "temp_filename": None}
+                print(f"爬取图表图片失败：{e}")
+                return {"png_images": [], "temp_filename": None, "image_formats": {}}
             time.sleep(retry_delay)
     
-    return {"png_images": [], "temp_filename": None}
+    return {"png_images": [], "temp_filename": None, "image_formats": {}}
 
-def is_valid_image_url(url: str) -> bool:
-    """验证URL是否为有效的图片链接"""
-    # 检查URL是否包含常见的图片扩展名
-    image_extensions = ['.jpg', '.jpeg', '.png', '.gif', '.bmp', '.webp', '.svg']
-    url_lower = url.lower()
+def _parse_svg_length(value: Optional[str]) -> Optional[float]:
+    """解析SVG的长度属性（如 "400"、"300pt"），相对单位或格式错误时返回None"""
+    if not value:
+        return None
+    match = re.fullmatch(rf'\s*({_SVG_NUMBER})\s*([a-zA-Z]*)\s*', value)
+    if not match or match.group(2).lower() not in SVG_UNIT_TO_PX:
+        return None
+    return float(match.group(1)) * SVG_UNIT_TO_PX[match.group(2).lower()]
+
+def parse_image_header(data: bytes) -> Optional[dict]:
+    """从图片文件头部字节解析格式和尺寸，无法识别时返回None"""
+    # PNG：IHDR块紧跟文件签名
+    if data.startswith(b'\x89PNG\r\n\x1a\n') and len(data) >= 24:
+        width, height = struct.unpack('>II', data[16:24])
+        return {"format": "png", "width": width, "height": height}
+    
+    # GIF
+    if data[:6] in (b'GIF87a', b'GIF89a') and len(data) >= 10:
+        width, height = struct.unpack('<HH', data[6:10])
+        return {"format": "gif", "width": width, "height": height}
+    
+    # JPEG：逐段查找SOF标记
+    if data.startswith(b'\xff\xd8'):
+        i = 2
+        while i + 9 < len(data):
+            if data[i] != 0xFF:
+                i += 1
+                continue
+            marker = data[i + 1]
+            if marker == 0xFF:
+                i += 1
+                continue
+            if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7:
+                i += 2
+                continue
+            if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+                height, width = struct.unpack('>HH', data[i + 5:i + 9])
+                return {"format": "jpeg", "width": width, "height": height}
+            i += 2 + struct.unpack('>H', data[i + 2:i + 4])[0]
+        # SOF不在已读取的头部中（如EXIF很大），尺寸未知
+        return {"format": "jpeg", "width": None, "height": None}
     
-    # 检查是否包含图片扩展名
-    has_image_ext = any(ext in url_lower for ext in image_extensions)
+    # WebP：根据第一个块的类型解析尺寸
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP' and len(data) >= 30:
+        chunk = data[12:16]
+        if chunk == b'VP8 ':
+            width, height = struct.unpack('<HH', data[26:30])
+            return {"format": "webp", "width": width & 0x3FFF, "height": height & 0x3FFF}
+        if chunk == b'VP8L':
+            bits = struct.unpack('<I', data[21:25])[0]
+            return {"format": "webp", "width": (bits & 0x3FFF) + 1, "height": ((bits >> 14) & 0x3FFF) + 1}
+        if chunk == b'VP8X':
+            width = int.from_bytes(data[24:27], 'little') + 1
+            height = int.from_bytes(data[27:30], 'little') + 1
+            return {"format": "webp", "width": width, "height": height}
+        return {"format": "webp", "width": None, "height": None}
     
-    # 检查是否包含图片相关的路径
-    image_paths = ['/image', '/img', '/picture', '/photo', '/figure', '/fig']
-    has_image_path = any(path in url_lower for path in image_paths)
+    # BMP
+    if data[:2] == b'BM' and len(data) >= 26:
+        width, height = struct.unpack('<ii', data[18:26])
+        return {"format": "bmp", "width": width, "height": abs(height)}
     
-    # 排除一些明显不是图片的URL
-    exclude_patterns = ['logo', 'icon', 'avatar', 'button', 'banner']
-    is_excluded = any(pattern in url_lower for pattern in exclude_patterns)
+    # SVG：读取根元素的width/height，缺失时使用viewBox
+    text = data.decode('utf-8', errors='ignore')
+    svg_match = _SVG_ROOT_PATTERN.match(text)
+    if svg_match:
+        svg_tag = svg_match.group(1)
+        width_match = re.search(r'\swidth\s*=\s*["\']([^"\']*)["\']', svg_tag)
+        height_match = re.search(r'\sheight\s*=\s*["\']([^"\']*)["\']', svg_tag)
+        width = _parse_svg_length(width_match.group(1) if width_match else None)
+        height = _parse_svg_length(height_match.group(1) if height_match else None)
+        if width is None or height is None:
+            viewbox_match = re.search(r'viewBox\s*=\s*["\']([^"\']*)["\']', svg_tag)
+            if viewbox_match:
+                parts = re.split(r'[\s,]+', viewbox_match.group(1).strip())
+                if len(parts) == 4 and all(re.fullmatch(rf'-?{_SVG_NUMBER}', part) for part in parts):
+                    width, height = float(parts[2]), float(parts[3])
+        return {"format": "svg", "width": width, "height": height}
     
-    return (has_image_ext or has_image_path) and not is_excluded
+    return None
+
+def is_figure_size(width, height) -> bool:
+    """按尺寸和宽高比判断是否像论文图表（排除图标、按钮、横幅等）"""
+    # 尺寸未知（如矢量图未声明尺寸）时不做过滤
+    if not width or not height:
+        return True
+    if width < MIN_FIGURE_SIZE or height < MIN_FIGURE_SIZE:
+        return False
+    aspect_ratio = width / height
+    return 1 / MAX_FIGURE_ASPECT_RATIO <= aspect_ratio <= MAX_FIGURE_ASPECT_RATIO
+
+def _fetch_image_info(url: str):
+    """请求图片头部并解析，返回 (图片信息, 是否为可缓存的确定结论)"""
+    if not url.startswith(('http://', 'https://')):
+        return None, True
+    
+    headers = {
+        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/123.0.0.0 Safari/537.36',
+        'Range': f'bytes=0-{IMAGE_HEADER_BYTES - 1}'
+    }
+    try:
+        # 服务器不支持Range时会返回完整内容，读够头部后即关闭连接
+        with requests.get(url, headers=headers, timeout=5, stream=True) as response:
+            if response.status_code not in (200, 206):
+                # 4xx（429除外）说明图片不存在或不可访问，其余视为临时失败
+                return None, 400 <= response.status_code < 500 and response.status_code != 429
+            
+            # HTML页面（如错误页、落地页）不是图片
+            content_type = response.headers.get('Content-Type', '').lower()
+            if content_type.startswith(('text/html', 'application/xhtml')):
+                return None, True
+            
+            data = b""
+            for chunk in response.iter_content(chunk_size=4096):
+                data += chunk
+                if len(data) >= IMAGE_HEADER_BYTES:
+                    break
+    except requests.exceptions.RequestException as e:
+        print(f"获取图片头部失败：{url}，{e}")
+        return None, False
+    
+    try:
+        info = parse_image_header(data)
+    except Exception as e:
+        print(f"解析图片头部失败：{url}，{e}")
+        return None, True
+    
+    if info is not None:
+        info["is_figure"] = is_figure_size(info["width"], info["height"])
+    return info, True
+
+def _classify_image(url: str) -> Tuple[Optional[dict], bool]:
+    """分类图片并返回 (图片信息, 是否为确定结论)，确定的结论按URL缓存"""
+    with _image_cache_lock:
+        if url in image_classification_cache:
+            return image_classification_cache[url], True
+        future = _image_inflight.get(url)
+        is_owner = future is None
+        if is_owner:
+            future = Future()
+            _image_inflight[url] = future
+    
+    # 同一URL正在被其他线程分类时直接等待其结果
+    if not is_owner:
+        return future.result()
+    
+    result = (None, False)
+    try:
+        result = _fetch_image_info(url)
+        if result[1]:
+            with _image_cache_lock:
+                image_classification_cache[url] = result[0]
+    finally:
+        with _image_cache_lock:
+            del _image_inflight[url]
+        future.set_result(result)
+    return result
+
+def classify_image(url: str) -> Optional[dict]:
+    """只下载图片头部几KB，解析格式和尺寸并判定是否为图表，无法识别或暂时无法获取时返回None"""
+    return _classify_image(url)[0]
+
+def is_valid_image_url(url: str) -> bool:
+    """根据图片头部判断URL是否为有效的论文图片"""
+    info, definitive = _classify_image(url)
+    # 超时、5xx、429等临时失败无法判断，保留该候选而不是直接丢弃
+    if not definitive:
+        return True
+    return bool(info and info["is_figure"])
+
+def filter_figure_images(urls: List[str]) -> List[str]:
+    """并发分类候选图片，保持原有顺序返回判定为图表的URL"""
+    if not urls:
+        return []
+    with ThreadPoolExecutor(max_workers=IMAGE_CLASSIFY_WORKERS) as executor:
+        verdicts = list(executor.map(is_valid_image_url, urls))
+    return [url for url, keep in zip(urls, verdicts) if keep]
 
 def text_summarizer(state: PPTState):
     """使用LLM总结文字内容"""
@@ -406,7 +778,8 @@ def generate_paper_introduction(url: str) -> str:
         text_summary="",
         paper_title="未知论文", # 初始化论文标题
         png_images=[], # 初始化PNG图片列表
-        temp_filename="" # 初始化临时文件名
+        temp_filename="", # 初始化临时文件名
+        image_formats={} # 初始化图片格式
     )
     
     # 第一步：爬取网页内容
@@ -414,8 +787,8 @@ def generate_paper_introduction(url: str) -> str:
     scraped_result = web_scraper(state)
     state.update(scraped_result)
     
-    # 第二步：爬取PNG图片
-    print("正在爬取PNG图片...")
+    # 第二步：爬取图表图片
+    print("正在爬取图表图片...")
     png_result = arxiv_png_crawler(state)
     state.update(png_result)
 
@@ -450,7 +823,7 @@ def generate_paper_introduction(url: str) -> str:
         json.dump(final_result, f, ensure_ascii=False, indent=2)
     
     # 生成HTML报告
-    html_path = generate_html_report(url, state["text_summary"], state["image_urls"], state["scraped_text"], state["paper_title"], state["png_images"])
+    html_path = generate_html_report(url, state["text_summary"], state["image_urls"], state["scraped_text"], state["paper_title"], state["png_images"], state["image_formats"])
     
     # 删除临时文件
     if state.get("temp_filename"):
@@ -469,22 +842,24 @@ def generate_paper_introduction(url: str) -> str:
     
     return state["text_summary"]
 
-def generate_html_report(url: str, summary: str, image_urls: List[str], original_text: str, paper_title: str = "未知论文", png_images: List[str] = None):
+def generate_html_report(url: str, summary: str, image_urls: List[str], original_text: str, paper_title: str = "未知论文", png_images: List[str] = None, image_formats: Dict[str, str] = None):
     """生成包含图片的HTML报告"""
     
     if png_images is None:
         png_images = []
+    if image_formats is None:
+        image_formats = {}
     
-    # 生成图片HTML - 只使用PNG图片
+    # 生成图片HTML - 使用筛选后的图表图片
     images_html = ""
     
     if png_images:
-        images_html = '<div class="images-section">\n<h2>📷 论文PNG图片</h2>\n<div class="image-gallery">\n'
+        images_html = '<div class="images-section">\n<h2>📷 论文图片</h2>\n<div class="image-gallery">\n'
         
-        # 显示PNG图片（限制20张）
+        # 显示图表图片（限制20张）
         for i, img_url in enumerate(png_images[:20], 1):
             # 尝试从URL中提取图片名称
-            img_name = f"PNG图片 {i}"
+            img_name = f"图片 {i}"
             
             # 从URL路径中提取文件名
             path_parts = img_url.split('/')
@@ -499,10 +874,13 @@ def generate_html_report(url: str, summary: str, image_urls: List[str], original
             if fig_match:
                 img_name = f"Figure {fig_match.group(1)}"
             
+            # 图片格式来自爬取时的分类结果
+            img_format = (image_formats.get(img_url) or "image").upper()
+            
             images_html += f'''
             <div class="image-item">
                 <img src="{img_url}" alt="{img_name}" onerror="this.style.display='none'; this.nextElementSibling.innerHTML='图片加载失败'">
-                <p class="image-caption">{img_name} (PNG)</p>
+                <p class="image-caption">{img_name} ({img_format})</p>
             </div>'''
         images_html += '</div>\n</div>\n'
     
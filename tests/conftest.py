@@ -0,0 +1,6 @@
+import os
+import sys
+
+# paper_reader 在导入时创建OpenAI客户端，需要提供API Key
+os.environ.setdefault("QWEN_API_KEY", "test-key")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
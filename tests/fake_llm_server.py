@@ -0,0 +1,97 @@
+"""OpenAI兼容的本地模拟LLM服务器，按模型名模拟不同的延迟分布"""
+import json
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# 模型名 -> 行为
+#   fast      ：约50毫秒后返回
+#   stall     ：返回首字节前卡住15秒（模拟尾延迟）
+#   late      ：固定0.4秒后返回
+#   longtail  ：每5个请求中有1个卡住3秒，其余快速返回
+#   error*    ：立即返回400错误（不会被客户端重试）
+STALL_SECONDS = 15
+LATE_SECONDS = 0.4
+LONGTAIL_SECONDS = 3
+LONGTAIL_EVERY = 5
+
+
+class FakeLLMServer:
+    """在后台线程运行的模拟服务器，记录每个模型收到的请求数"""
+
+    def __init__(self):
+        self.request_counts = {}
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), self._make_handler())
+        self.httpd.daemon_threads = True
+        self.base_url = f"http://127.0.0.1:{self.httpd.server_address[1]}/v1"
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stopped.set()
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def _count(self, model: str) -> int:
+        with self.lock:
+            self.request_counts[model] = self.request_counts.get(model, 0) + 1
+            return self.request_counts[model]
+
+    def _delay(self, model: str, count: int) -> float:
+        if model == "stall":
+            return STALL_SECONDS
+        if model == "late":
+            return LATE_SECONDS
+        if model == "longtail" and count % LONGTAIL_EVERY == 0:
+            return LONGTAIL_SECONDS
+        return 0.05
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                model = body["model"]
+                count = server._count(model)
+
+                if model.startswith("error"):
+                    payload = json.dumps({"error": {"message": f"{model} failed", "type": "invalid_request_error"}}).encode()
+                    self.send_response(400)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(payload)))
+                    self.end_headers()
+                    self.wfile.write(payload)
+                    return
+
+                # 服务器关闭时提前结束等待
+                if server.stopped.wait(server._delay(model, count)):
+                    return
+
+                try:
+                    self.send_response(200)
+                    self.send_header("Content-Type", "text/event-stream")
+                    self.end_headers()
+                    for text in ("reply from ", model):
+                        chunk = {
+                            "id": "chatcmpl-fake",
+                            "object": "chat.completion.chunk",
+                            "created": int(time.time()),
+                            "model": model,
+                            "choices": [{"index": 0, "delta": {"content": text}, "finish_reason": None}],
+                        }
+                        self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                        self.wfile.flush()
+                    self.wfile.write(b"data: [DONE]\n\n")
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+
+        return Handler
@@ -0,0 +1,146 @@
+import asyncio
+import time
+
+import pytest
+
+import paper_reader
+from paper_reader import LatencyHistogram
+from fake_llm_server import FakeLLMServer
+
+MESSAGES = [{"role": "user", "content": "hi"}]
+
+
+@pytest.fixture
+def fake_server(monkeypatch):
+    server = FakeLLMServer().start()
+    monkeypatch.setattr(paper_reader, "QWEN_BASE_URL", server.base_url)
+    monkeypatch.setattr(paper_reader, "HEDGE_BASE_URL", server.base_url)
+    monkeypatch.setattr(paper_reader, "HEDGE_API_KEY", "test-key")
+    monkeypatch.setattr(paper_reader, "QWEN_TIMEOUT", 10.0)
+    monkeypatch.setattr(paper_reader, "HEDGE_DEFAULT_DELAY", 0.3)
+    monkeypatch.setattr(paper_reader, "HEDGE_MIN_SAMPLES", 20)
+    monkeypatch.setattr(paper_reader, "latency_histograms", {})
+    yield server
+    server.stop()
+
+
+def use_models(monkeypatch, primary, hedge):
+    monkeypatch.setattr(paper_reader, "QWEN_MODEL", primary)
+    monkeypatch.setattr(paper_reader, "HEDGE_MODEL", hedge)
+
+
+def test_hedge_wins_and_cancels_stalled_primary(fake_server, monkeypatch):
+    use_models(monkeypatch, "stall", "fast")
+    start = time.monotonic()
+    assert paper_reader.qwen_hedged_chat(MESSAGES) == "reply from fast"
+    # 慢请求被取消后函数立即返回，不等待其结束
+    assert time.monotonic() - start < 2
+    # 被取消的主请求记录截尾样本
+    stall_histogram = paper_reader.latency_histograms["stall"]
+    assert stall_histogram.total == 1
+    assert stall_histogram.percentile(50) >= 0.3
+
+
+def test_primary_wins_without_hedge(fake_server, monkeypatch):
+    use_models(monkeypatch, "fast", "stall")
+    assert paper_reader.qwen_hedged_chat(MESSAGES) == "reply from fast"
+    assert "stall" not in fake_server.request_counts
+
+
+def test_primary_fails_fast_triggers_hedge_immediately(fake_server, monkeypatch):
+    use_models(monkeypatch, "error-primary", "fast")
+    monkeypatch.setattr(paper_reader, "HEDGE_DEFAULT_DELAY", 5.0)
+    start = time.monotonic()
+    assert paper_reader.qwen_hedged_chat(MESSAGES) == "reply from fast"
+    assert time.monotonic() - start < 2
+
+
+def test_both_fail_reports_both_errors(fake_server, monkeypatch):
+    use_models(monkeypatch, "error-primary", "error-hedge")
+    with pytest.raises(RuntimeError) as excinfo:
+        paper_reader.qwen_hedged_chat(MESSAGES)
+    assert "error-primary failed" in str(excinfo.value)
+    assert "error-hedge failed" in str(excinfo.value)
+
+
+def test_deadline_exceeded(fake_server, monkeypatch):
+    use_models(monkeypatch, "stall", "stall")
+    monkeypatch.setattr(paper_reader, "QWEN_TIMEOUT", 0.5)
+    # 对冲延迟大于总超时时，首次等待也不能超过总超时
+    monkeypatch.setattr(paper_reader, "HEDGE_DEFAULT_DELAY", 5.0)
+    start = time.monotonic()
+    with pytest.raises(TimeoutError):
+        paper_reader.qwen_hedged_chat(MESSAGES)
+    assert time.monotonic() - start < 2
+
+
+def test_cancelled_hedge_on_same_model_is_not_recorded(fake_server, monkeypatch):
+    # 主请求在对冲请求发出后不久返回，被取消的对冲请求耗时很短，不能计入直方图
+    use_models(monkeypatch, "late", "late")
+    assert paper_reader.qwen_hedged_chat(MESSAGES) == "reply from late"
+    assert fake_server.request_counts["late"] == 2
+    histogram = paper_reader.latency_histograms["late"]
+    assert histogram.total == 1
+    assert histogram.percentile(0) >= 0.4
+
+
+def test_qwen_chat_inside_running_event_loop(fake_server, monkeypatch):
+    use_models(monkeypatch, "fast", "fast")
+    monkeypatch.setattr(paper_reader, "HEDGE_ENABLED", True)
+
+    async def main():
+        return paper_reader.qwen_chat(MESSAGES)
+
+    assert asyncio.run(main()) == "reply from fast"
+
+
+def test_async_clients_are_reused(fake_server, monkeypatch):
+    use_models(monkeypatch, "fast", "fast")
+    paper_reader.qwen_hedged_chat(MESSAGES)
+    clients = dict(paper_reader._async_clients)
+    paper_reader.qwen_hedged_chat(MESSAGES)
+    assert paper_reader._async_clients == clients
+    key = (fake_server.base_url, "test-key")
+    assert paper_reader._async_clients[key] is clients[key]
+
+
+def test_long_tail_latency_is_hedged(fake_server, monkeypatch):
+    use_models(monkeypatch, "longtail", "longtail")
+    monkeypatch.setattr(paper_reader, "HEDGE_MIN_SAMPLES", 5)
+    durations = []
+    for _ in range(15):
+        start = time.monotonic()
+        assert paper_reader.qwen_hedged_chat(MESSAGES) == "reply from longtail"
+        durations.append(time.monotonic() - start)
+    # 每个3秒的慢请求都被对冲掉
+    assert max(durations) < 2
+    # 慢请求以截尾样本计入直方图，阈值不会只由快请求决定
+    histogram = paper_reader.latency_histograms["longtail"]
+    assert histogram.percentile(100) >= paper_reader.HEDGE_DEFAULT_DELAY
+
+
+def test_latency_histogram_percentile():
+    histogram = LatencyHistogram()
+    assert histogram.percentile(95) is None
+    for _ in range(90):
+        histogram.record(0.4)
+    for _ in range(10):
+        histogram.record(3.0)
+    assert histogram.percentile(50) == 0.5
+    assert histogram.percentile(95) == pytest.approx(4.0)
+    # 超过最大分桶的样本归入最后一档
+    histogram.record(10000)
+    assert histogram.percentile(100) == LatencyHistogram.BUCKETS[-1]
+
+
+def test_latency_histogram_decay():
+    histogram = LatencyHistogram()
+    for _ in range(LatencyHistogram.MAX_SAMPLES - 1):
+        histogram.record(0.4)
+    assert histogram.total == LatencyHistogram.MAX_SAMPLES - 1
+    histogram.record(0.4)
+    assert histogram.total == LatencyHistogram.MAX_SAMPLES // 2
+    # 衰减后新的慢样本更快影响分位数
+    for _ in range(LatencyHistogram.MAX_SAMPLES // 2 - 1):
+        histogram.record(3.0)
+    assert histogram.percentile(60) == pytest.approx(4.0)
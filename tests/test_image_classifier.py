@@ -0,0 +1,135 @@
+import struct
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import pytest
+
+import paper_reader
+from paper_reader import parse_image_header
+
+
+def png_header(width, height):
+    return b'\x89PNG\r\n\x1a\n' + b'\x00\x00\x00\rIHDR' + struct.pack('>II', width, height) + b'\x08\x02\x00\x00\x00'
+
+
+def test_parse_png_and_gif():
+    assert parse_image_header(png_header(640, 480)) == {"format": "png", "width": 640, "height": 480}
+    assert parse_image_header(b'GIF89a' + struct.pack('<HH', 300, 200)) == {"format": "gif", "width": 300, "height": 200}
+
+
+def test_parse_svg_with_prolog_and_viewbox():
+    data = b'<?xml version="1.0"?>\n<!-- figure -->\n<!DOCTYPE svg>\n<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 400 300">'
+    assert parse_image_header(data) == {"format": "svg", "width": 400.0, "height": 300.0}
+
+
+def test_parse_svg_with_doctype_internal_subset():
+    # Adobe Illustrator导出的SVG带有内部子集的DOCTYPE
+    data = (b'<?xml version="1.0" encoding="utf-8"?>\n'
+            b'<!DOCTYPE svg PUBLIC "-//W3C//DTD SVG 1.1//EN" "http://www.w3.org/Graphics/SVG/1.1/DTD/svg11.dtd" [\n'
+            b'  <!ENTITY ns_extend "http://ns.adobe.com/Extensibility/1.0/">\n'
+            b']>\n'
+            b'<svg width="400px" height="300px">')
+    assert parse_image_header(data) == {"format": "svg", "width": 400.0, "height": 300.0}
+
+
+def test_parse_svg_with_multiple_processing_instructions():
+    data = (b'<?xml version="1.0"?>\n'
+            b'<?xml-stylesheet type="text/css" href="style.css"?>\n'
+            b'<svg width="400px" height="300px">')
+    assert parse_image_header(data) == {"format": "svg", "width": 400.0, "height": 300.0}
+
+
+def test_parse_svg_converts_absolute_units():
+    info = parse_image_header(b'<svg width="3in" height="150pt">')
+    assert info["width"] == pytest.approx(288)
+    assert info["height"] == pytest.approx(200)
+
+
+@pytest.mark.parametrize("tag", [
+    b'<svg width="1.2.3" height="500">',
+    b'<svg width="10em" height="10em">',
+    b'<svg width="50%" height="abc">',
+])
+def test_parse_svg_unknown_or_malformed_lengths(tag):
+    info = parse_image_header(tag)
+    assert info["format"] == "svg"
+    assert info["width"] is None
+    # 尺寸未知时不按尺寸过滤
+    assert paper_reader.is_figure_size(info["width"], info["height"])
+
+
+def test_html_with_inline_svg_is_not_an_image():
+    assert parse_image_header(b'<html><body><svg width="400" height="300">') is None
+
+
+class ImageHandler(BaseHTTPRequestHandler):
+    """按路径返回不同响应：/ok.png 正常图片，/missing 404，/busy 503，/page HTML页面"""
+    counts = {}
+    lock = threading.Lock()
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        with self.lock:
+            self.counts[self.path] = self.counts.get(self.path, 0) + 1
+        if self.path == "/ok.png":
+            time.sleep(0.2)
+            self._reply(200, "image/png", png_header(640, 480))
+        elif self.path == "/missing":
+            self._reply(404, "text/plain", b"not found")
+        elif self.path == "/busy":
+            self._reply(503, "text/plain", b"busy")
+        elif self.path == "/page":
+            self._reply(200, "text/html", b'<svg width="400" height="300"></svg>')
+
+    def _reply(self, status, content_type, body):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def image_server(monkeypatch):
+    monkeypatch.setattr(paper_reader, "image_classification_cache", {})
+    ImageHandler.counts = {}
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), ImageHandler)
+    httpd.daemon_threads = True
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_transient_failures_are_not_cached(image_server):
+    url = image_server + "/busy"
+    assert paper_reader.classify_image(url) is None
+    assert url not in paper_reader.image_classification_cache
+    paper_reader.classify_image(url)
+    assert ImageHandler.counts["/busy"] == 2
+
+
+def test_transient_failures_are_kept_by_filter(image_server):
+    urls = [image_server + "/busy", image_server + "/missing", image_server + "/ok.png"]
+    assert paper_reader.filter_figure_images(urls) == [image_server + "/busy", image_server + "/ok.png"]
+
+
+def test_definitive_verdicts_are_cached(image_server):
+    for path in ("/missing", "/page", "/ok.png"):
+        paper_reader.classify_image(image_server + path)
+        paper_reader.classify_image(image_server + path)
+        assert ImageHandler.counts[path] == 1
+    assert paper_reader.image_classification_cache[image_server + "/page"] is None
+    assert paper_reader.is_valid_image_url(image_server + "/ok.png")
+
+
+def test_concurrent_lookups_share_one_request(image_server):
+    url = image_server + "/ok.png"
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(paper_reader.classify_image, [url] * 8))
+    assert all(result["format"] == "png" for result in results)
+    assert ImageHandler.counts["/ok.png"] == 1